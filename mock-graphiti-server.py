@@ -2,11 +2,19 @@
 """
 Mock Graphiti Server for UltraThink
 Simple implementation for testing graph memory integration
+
+Clients should reuse one aiohttp.ClientSession (as UltraThinkCLI does)
+so requests ride keep-alive connections instead of reconnecting each time.
 """
 
+import hashlib
 import json
+import mmap
 import os
+import re
+import sys
 import asyncio
+from collections import Counter, defaultdict
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any
@@ -14,6 +22,11 @@ import logging
 
 from aiohttp import web
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,45 +34,279 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Rewrite the JSONL stores from memory after this many appended records
+COMPACT_EVERY = 10000
+# Window in seconds for coalescing writes from concurrent requests
+FLUSH_DELAY = 0.01
+# Seconds to wait before retrying a flush that failed
+FLUSH_RETRY_DELAY = 1.0
+# Stores at least this large are read through mmap instead of buffered I/O
+MMAP_THRESHOLD = 100 * 1024 * 1024
+
+_TOKEN_RE = re.compile(r'\w+')
+
+def _tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens for the inverted index"""
+    # Interned so every index key and query token share one str object
+    return [sys.intern(token) for token in _TOKEN_RE.findall(text.lower())]
+
+def _json_response(data: Any, non_str_keys: bool = False) -> web.Response:
+    """Build a JSON response, encoding with orjson when it is installed"""
+    if orjson is None:
+        return web.json_response(data)
+    option = orjson.OPT_NON_STR_KEYS if non_str_keys else 0
+    return web.Response(body=orjson.dumps(data, option=option),
+                        content_type='application/json')
+
+def _loads(data) -> Any:
+    """Decode JSON, with orjson when it is installed"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def _encode_lines(records: List[Dict[str, Any]]) -> bytes:
+    """Encode records as JSON Lines, with orjson when it is installed"""
+    if orjson is not None:
+        return b"".join(orjson.dumps(record) + b"\n" for record in records)
+    return "".join(json.dumps(record) + "\n" for record in records).encode()
+
+async def _read_json(request) -> Any:
+    """Decode a JSON request body"""
+    return _loads(await request.read())
+
+def _content_digest(content: Any) -> int:
+    """Compact 64-bit key for deduplicating memories by content"""
+    # An int key is ~15% smaller in the set than a 16-byte digest, and
+    # collisions stay negligible (~1e-6 at ten million memories). Hashing the
+    # JSON form keeps None apart from "None" and 1 apart from "1"
+    encoded = json.dumps(content, sort_keys=True, separators=(',', ':')).encode()
+    digest = hashlib.blake2b(encoded, digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
 class MockGraphitiServer:
     def __init__(self, data_dir: str = "~/.graphiti-data"):
         self.data_dir = Path(data_dir).expanduser()
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
-        self.memories_file = self.data_dir / "memories.json"
-        self.nodes_file = self.data_dir / "nodes.json"
-        self.edges_file = self.data_dir / "edges.json"
+        # Append-only JSON Lines stores, one record per line
+        self.memories_file = self.data_dir / "memories.jsonl"
+        self.nodes_file = self.data_dir / "nodes.jsonl"
+        self.edges_file = self.data_dir / "edges.jsonl"
+        self._appends = 0
+        
+        # Records waiting for the next flush, per store file
+        self._pending: Dict[Path, List[Dict[str, Any]]] = defaultdict(list)
+        self._dirty = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._flush_task = None
+        # Set when a compaction fails part way, so the next flush redoes it
+        self._compact_due = False
         
         self._load_data()
         
     def _load_data(self):
-        """Load existing data from files"""
-        self.memories = self._load_json(self.memories_file, [])
-        self.nodes = self._load_json(self.nodes_file, [])
-        self.edges = self._load_json(self.edges_file, [])
-        
-    def _load_json(self, file_path: Path, default: Any) -> Any:
-        """Load JSON file with default"""
-        if file_path.exists():
+        """Load existing data from files and rebuild the indexes"""
+        self.memories = []
+        # token -> positions in self.memories containing it
+        self.token_index: Dict[str, set] = defaultdict(set)
+        self.content_hashes = set()
+        self.project_counts = Counter()
+        self.tag_counts = Counter()
+        self.memories_by_project: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.memories_by_tag: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for memory in self._load_jsonl(self.memories_file):
+            self._add_memory(memory)
+            
+        self.nodes = []
+        self.node_token_index: Dict[str, set] = defaultdict(set)
+        for node in self._load_jsonl(self.nodes_file):
+            self._add_node(node)
+            
+        self.edges = self._load_jsonl(self.edges_file)
+        
+    def _add_memory(self, memory: Dict[str, Any]):
+        """Add a memory to the in-memory store and its indexes"""
+        position = len(self.memories)
+        self.memories.append(memory)
+        self.content_hashes.add(_content_digest(memory.get("content")))
+        self.project_counts[memory.get("project", "general")] += 1
+        self.tag_counts.update(memory.get("tags", []))
+        
+        self.memories_by_project[memory.get("project", "general")].append(memory)
+        for tag in dict.fromkeys(memory.get("tags", [])):
+            self.memories_by_tag[tag].append(memory)
+        
+        for token in _tokenize(memory.get("content") or ""):
+            self.token_index[token].add(position)
+            
+    def _add_node(self, node: Dict[str, Any]):
+        """Add a node to the in-memory store and its token index"""
+        position = len(self.nodes)
+        self.nodes.append(node)
+        
+        for token in _tokenize(str(node.get("content") or "")):
+            self.node_token_index[token].add(position)
+            
+    def _search(self, index: Dict[str, set], records: List[Dict[str, Any]],
+                query: str) -> List[Dict[str, Any]]:
+        """Return records containing every query token, in insertion order"""
+        tokens = _tokenize(query)
+        if not tokens:
+            return list(records)
+            
+        postings = sorted((index.get(token, set()) for token in set(tokens)), key=len)
+        hits = postings[0].intersection(*postings[1:])
+        return [records[i] for i in sorted(hits)]
+        
+    def _load_jsonl(self, file_path: Path) -> List[Dict[str, Any]]:
+        """Load a JSONL store, falling back to the legacy .json array"""
+        if not file_path.exists():
+            legacy = file_path.with_suffix(".json")
+            if legacy.exists():
+                try:
+                    with open(legacy, 'rb') as f:
+                        records = _loads(f.read())
+                    self._rewrite(file_path, records)
+                    logger.info(f"Migrated {legacy.name} to {file_path.name}")
+                    return records
+                except Exception as e:
+                    logger.warning(f"Failed to migrate {legacy}: {e}")
+            return []
+            
+        # Raw bytes go straight to the decoder, skipping per-line str decoding
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+                return self._parse_lines(f, file_path)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return self._parse_lines(iter(mm.readline, b""), file_path)
+                
+    def _parse_lines(self, lines, file_path: Path) -> List[Dict[str, Any]]:
+        """Decode JSONL byte lines, skipping blank and corrupt ones"""
+        records = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                records.append(_loads(line))
+            except json.JSONDecodeError:
+                # Most likely a torn write at the tail; compaction drops it
+                logger.warning(f"Skipping corrupt line in {file_path.name}")
+        return records
+        
+    def _append(self, file_path: Path, *records: Dict[str, Any]):
+        """Append records to a JSONL store with a single write + fsync"""
+        if not records:
+            return
+            
+        with open(file_path, 'ab') as f:
+            start = f.tell()
+            try:
+                f.write(_encode_lines(records))
+                f.flush()
+                os.fsync(f.fileno())
+            except OSError:
+                # Drop a torn tail so a retry doesn't glue onto half a line
+                f.truncate(start)
+                raise
+            
+        self._appends += len(records)
+        
+    def _queue_write(self, file_path: Path, *records: Dict[str, Any]):
+        """Queue records for the flush loop to append"""
+        if records:
+            self._pending[file_path].extend(records)
+            self._dirty.set()
+            
+    def _persist_sync(self, writes: List):
+        """Append (file, records) pairs, dropping each once written; runs in a worker thread"""
+        while writes:
+            file_path, records = writes[0]
+            self._append(file_path, *records)
+            del writes[0]
+            
+    def _requeue(self, writes: List):
+        """Put unwritten (file, records) pairs back ahead of newer queued records"""
+        for file_path, records in writes:
+            self._pending[file_path][:0] = records
+        if writes:
+            self._dirty.set()
+            
+    def _compact_sync(self, *stores):
+        """Rewrite (file, records) stores from a snapshot; runs in a worker thread"""
+        for file_path, records in stores:
+            self._rewrite(file_path, records)
+        self._appends = 0
+        logger.info("Compacted data files")
+        
+    async def _flush(self, compact: bool = False):
+        """Write every queued record with one append + fsync per store"""
+        async with self._write_lock:
+            self._dirty.clear()
+            writes = list(self._pending.items())
+            self._pending = defaultdict(list)
+            queued = sum(len(records) for _, records in writes)
+            
             try:
-                with open(file_path, 'r') as f:
-                    return json.load(f)
-            except:
+                if compact or self._compact_due or self._appends + queued >= COMPACT_EVERY:
+                    # Some stores may already be rewritten if this fails, so
+                    # appending the queued records after it could duplicate them
+                    self._compact_due = True
+                    # Snapshot on the loop thread; it already holds the queued records
+                    await asyncio.to_thread(
+                        self._compact_sync,
+                        (self.memories_file, list(self.memories)),
+                        (self.nodes_file, list(self.nodes)),
+                        (self.edges_file, list(self.edges))
+                    )
+                    self._compact_due = False
+                elif queued:
+                    await asyncio.to_thread(self._persist_sync, writes)
+            except BaseException:
+                # Clients were already answered, so keep what isn't on disk for
+                # the next flush instead of losing it
+                self._requeue(writes)
+                raise
+                
+    async def _flush_loop(self):
+        """Coalesce writes from concurrent requests into one flush per window"""
+        while True:
+            await self._dirty.wait()
+            await asyncio.sleep(FLUSH_DELAY)
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.error(f"Failed to flush data files, retrying: {e}")
+                await asyncio.sleep(FLUSH_RETRY_DELAY)
+                
+    async def start(self, app=None):
+        """Start the background flush loop"""
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        
+    async def stop(self, app=None):
+        """Stop the flush loop and write out anything still queued"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
                 pass
-        return default
-        
-    def _save_data(self):
-        """Save data to files"""
-        with open(self.memories_file, 'w') as f:
-            json.dump(self.memories, f, indent=2)
-        with open(self.nodes_file, 'w') as f:
-            json.dump(self.nodes, f, indent=2)
-        with open(self.edges_file, 'w') as f:
-            json.dump(self.edges, f, indent=2)
+            self._flush_task = None
+        await self._flush()
+        
+    def _rewrite(self, file_path: Path, records: List[Dict[str, Any]]):
+        """Atomically replace a JSONL store via tmp file + rename"""
+        tmp_path = file_path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(_encode_lines(records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+        
+    async def compact(self):
+        """Rewrite all stores from memory, dropping any corrupt lines"""
+        await self._flush(compact=True)
             
     async def health(self, request):
         """Health check endpoint"""
-        return web.json_response({
+        return _json_response({
             "status": "healthy",
             "service": "mock-graphiti",
             "timestamp": datetime.now().isoformat(),
@@ -72,7 +319,7 @@ class MockGraphitiServer:
         
     async def create_memory(self, request):
         """Create a new memory"""
-        data = await request.json()
+        data = await _read_json(request)
         
         memory = {
             "id": f"mem-{len(self.memories)+1}",
@@ -83,7 +330,7 @@ class MockGraphitiServer:
             "metadata": data.get("metadata", {})
         }
         
-        self.memories.append(memory)
+        self._add_memory(memory)
         
         # Create node for this memory
         node = {
@@ -93,9 +340,10 @@ class MockGraphitiServer:
             "content": memory["content"],
             "created": memory["timestamp"]
         }
-        self.nodes.append(node)
+        self._add_node(node)
         
         # Create edges for tags
+        edges = []
         for tag in memory["tags"]:
             edge = {
                 "id": f"edge-{len(self.edges)+1}",
@@ -104,12 +352,15 @@ class MockGraphitiServer:
                 "type": "has_tag"
             }
             self.edges.append(edge)
+            edges.append(edge)
             
-        self._save_data()
+        self._queue_write(self.memories_file, memory)
+        self._queue_write(self.nodes_file, node)
+        self._queue_write(self.edges_file, *edges)
         
         logger.info(f"Created memory: {memory['id']} for project {memory['project']}")
         
-        return web.json_response(memory)
+        return _json_response(memory)
         
     async def get_memories(self, request):
         """Get memories with optional filtering"""
@@ -117,73 +368,71 @@ class MockGraphitiServer:
         tag = request.query.get('tag')
         limit = int(request.query.get('limit', 100))
         
-        filtered = self.memories
-        
-        if project:
-            filtered = [m for m in filtered if m['project'] == project]
-        if tag:
-            filtered = [m for m in filtered if tag in m.get('tags', [])]
+        if project and tag:
+            by_project = self.memories_by_project.get(project, [])
+            by_tag = self.memories_by_tag.get(tag, [])
+            # Walk the shorter list and check the other filter per memory
+            if len(by_project) <= len(by_tag):
+                filtered = [m for m in by_project if tag in m.get('tags', [])]
+            else:
+                filtered = [m for m in by_tag if m.get('project', 'general') == project]
+        elif project:
+            filtered = self.memories_by_project.get(project, [])
+        elif tag:
+            filtered = self.memories_by_tag.get(tag, [])
+        else:
+            filtered = self.memories
             
-        return web.json_response({
+        return _json_response({
             "memories": filtered[:limit],
             "total": len(filtered)
         })
         
     async def sync_memories(self, request):
         """Sync memories from UltraThink"""
-        data = await request.json()
+        data = await _read_json(request)
         
-        synced = 0
+        # Items in one sync arrived together, so they share one fallback timestamp
+        batch_ts = datetime.now().isoformat()
+        synced = []
         for memory_data in data.get("memories", []):
             # Check if memory already exists
-            existing = next((m for m in self.memories 
-                           if m.get("content") == memory_data.get("content")), None)
-            
-            if not existing:
+            if _content_digest(memory_data.get("content")) not in self.content_hashes:
                 memory = {
                     "id": f"mem-{len(self.memories)+1}",
                     "content": memory_data.get("content"),
                     "project": memory_data.get("project", "general"),
                     "tags": memory_data.get("tags", []),
-                    "timestamp": memory_data.get("timestamp", datetime.now().isoformat()),
+                    "timestamp": memory_data.get("timestamp", batch_ts),
                     "source": "ultrathink"
                 }
-                self.memories.append(memory)
-                synced += 1
+                self._add_memory(memory)
+                synced.append(memory)
                 
-        self._save_data()
+        self._queue_write(self.memories_file, *synced)
         
-        logger.info(f"Synced {synced} new memories")
+        logger.info(f"Synced {len(synced)} new memories")
         
-        return web.json_response({
-            "synced": synced,
+        return _json_response({
+            "synced": len(synced),
             "total_memories": len(self.memories)
         })
         
     async def query_graph(self, request):
         """Query the knowledge graph"""
-        data = await request.json()
+        data = await _read_json(request)
         query = data.get("query", "")
         project = data.get("project")
         
-        # Simple keyword search
-        results = []
-        query_lower = query.lower()
-        
-        for memory in self.memories:
-            if project and memory.get("project") != project:
-                continue
-                
-            if query_lower in memory.get("content", "").lower():
-                results.append(memory)
-                
+        # Keyword search over the token indexes
+        results = self._search(self.token_index, self.memories, query)
+        if project:
+            results = [m for m in results if m.get("project") == project]
+            
         # Find related nodes
-        related_nodes = []
-        for node in self.nodes:
-            if query_lower in str(node.get("content", "")).lower():
-                related_nodes.append(node)
-                
-        return web.json_response({
+        related_nodes = self._search(self.node_token_index, self.nodes, query)
+        
+        return _json_response({
             "query": query,
             "memories": results[:10],
             "nodes": related_nodes[:10],
@@ -196,26 +445,19 @@ class MockGraphitiServer:
             "total_memories": len(self.memories),
             "total_nodes": len(self.nodes),
             "total_edges": len(self.edges),
-            "projects": {},
-            "tags": {}
+            "projects": dict(self.project_counts),
+            "tags": dict(self.tag_counts)
         }
         
-        # Count by project
-        for memory in self.memories:
-            project = memory.get("project", "general")
-            stats["projects"][project] = stats["projects"].get(project, 0) + 1
-            
-            # Count tags
-            for tag in memory.get("tags", []):
-                stats["tags"][tag] = stats["tags"].get(tag, 0) + 1
-                
-        return web.json_response(stats)
+        return _json_response(stats, non_str_keys=True)
 
 async def create_app():
     """Create the web application"""
     server = MockGraphitiServer()
     
     app = web.Application()
+    app.on_startup.append(server.start)
+    app.on_cleanup.append(server.stop)
     
     # Routes
     app.router.add_get('/health', server.health)
@@ -227,7 +469,7 @@ async def create_app():
     
     # Root endpoint
     async def root(request):
-        return web.json_response({
+        return _json_response({
             "service": "Mock Graphiti Server",
             "version": "1.0.0",
             "endpoints": {
@@ -264,5 +506,12 @@ if __name__ == "__main__":
 ╚═══════════════════════════════════════════╝
     """)
     
-    app = asyncio.get_event_loop().run_until_complete(create_app())
-    web.run_app(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    # uvloop is an optional drop-in for the default asyncio event loop
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
+    except ImportError:
+        pass
+        
+    web.run_app(create_app(), host="0.0.0.0", port=port)
\ No newline at end of file
@@ -9,6 +9,9 @@ import subprocess
 import asyncio
 import sys
 
+# StreamReader buffer per subprocess pipe; large tool lists fit in one frame
+READ_LIMIT = 1 << 20
+
 async def debug_mcp_communication():
     """Debug MCP communication step by step"""
     print("=== MCP Protocol Debugger ===\n")
@@ -19,34 +22,72 @@ async def debug_mcp_communication():
         'goose', 'mcp', 'ultrathink',
         stdin=asyncio.subprocess.PIPE,
         stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
+        stderr=asyncio.subprocess.PIPE,
+        limit=READ_LIMIT
     )
     
+    # Responses are routed by id to the future of the request awaiting them
+    pending = {}
+    unmatched = []
+    
+    async def read_responses():
+        """Read stdout continuously and resolve pending requests"""
+        while True:
+            try:
+                line = await process.stdout.readuntil(b'\n')
+            except asyncio.IncompleteReadError as e:
+                # EOF; anything left is an unterminated trailing frame
+                if e.partial.strip():
+                    print(f"Raw data: {e.partial.decode()}")
+                break
+            except asyncio.LimitOverrunError:
+                print(f"Frame larger than {READ_LIMIT} bytes, stopping reader")
+                break
+                
+            try:
+                response = json.loads(line.decode())
+            except json.JSONDecodeError as e:
+                print(f"JSON Error: {e}")
+                print(f"Raw data: {line.decode()}")
+                continue
+                
+            request_id = response.get("id")
+            if request_id == 0 and "error" in response and pending:
+                # The ID 0 bug: goose answers in order, so this error is for
+                # the oldest outstanding request
+                request_id = next(iter(pending))
+                print(f"Error response has ID 0, routing it to request {request_id}")
+                
+            future = pending.pop(request_id, None)
+            if future and not future.done():
+                future.set_result(response)
+            else:
+                print(f"Unmatched response: {json.dumps(response)}")
+                unmatched.append(response)
+                
+    reader_task = asyncio.create_task(read_responses())
+    
     # Function to send and receive
     async def send_and_receive(request, description):
         print(f"\n{description}")
         print(f"Sending: {json.dumps(request)}")
         
+        future = asyncio.get_running_loop().create_future()
+        pending[request["id"]] = future
+        
         # Send
         process.stdin.write((json.dumps(request) + '\n').encode())
         await process.stdin.drain()
         
-        # Read with timeout
+        # Wait for the reader to deliver the response
         try:
-            response_data = await asyncio.wait_for(
-                process.stdout.readline(),
-                timeout=2.0
-            )
-            response = json.loads(response_data.decode())
+            response = await asyncio.wait_for(future, timeout=2.0)
             print(f"Received: {json.dumps(response, indent=2)}")
             return response
         except asyncio.TimeoutError:
+            pending.pop(request["id"], None)
             print("TIMEOUT - No response received")
             return None
-        except json.JSONDecodeError as e:
-            print(f"JSON Error: {e}")
-            print(f"Raw data: {response_data.decode()}")
-            return None
     
     # Test 1: Initialize
     init_response = await send_and_receive({
@@ -66,13 +107,12 @@ async def debug_mcp_communication():
     if not init_response:
         print("\n✗ Initialize failed")
         process.terminate()
+        await process.wait()
+        reader_task.cancel()
         return
     
     print("\n✓ Initialize successful")
     
-    # Small delay
-    await asyncio.sleep(0.1)
-    
     # Test 2: List tools
     tools_response = await send_and_receive({
         "jsonrpc": "2.0",
@@ -96,83 +136,94 @@ async def debug_mcp_communication():
     
     # Test 3: Check for any extra output
     print("\nChecking for additional output...")
-    try:
-        extra = await asyncio.wait_for(process.stdout.read(100), timeout=0.5)
-        if extra:
-            print(f"Extra data found: {extra.decode()}")
-    except asyncio.TimeoutError:
+    await asyncio.sleep(0.5)
+    if unmatched:
+        print(f"Extra data found: {len(unmatched)} unmatched responses")
+    else:
         print("No extra data (good)")
     
     # Clean up
     process.terminate()
     await process.wait()
+    reader_task.cancel()
     print("\n=== Debug complete ===")
 
 
-async def test_other_mcp_servers():
-    """Test if other MCP servers have the same issue"""
-    print("\n=== Testing other MCP servers ===\n")
+async def probe_mcp_server(server):
+    """Initialize one MCP server and list its tools, returning report lines"""
+    report = [f"\nTesting {server}..."]
     
-    servers = ["memory", "developer", "tutorial"]
-    
-    for server in servers:
-        print(f"\nTesting {server}...")
+    try:
+        process = await asyncio.create_subprocess_exec(
+            'goose', 'mcp', server,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=READ_LIMIT
+        )
         
-        try:
-            process = await asyncio.create_subprocess_exec(
-                'goose', 'mcp', server,
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
+        # Send initialize
+        init_req = {
+            "jsonrpc": "2.0",
+            "method": "initialize",
+            "params": {
+                "protocolVersion": "2024-11-05",
+                "capabilities": {},
+                "clientInfo": {"name": "test", "version": "1.0"}
+            },
+            "id": 1
+        }
+        
+        process.stdin.write((json.dumps(init_req) + '\n').encode())
+        await process.stdin.drain()
+        
+        # Read response
+        response = await asyncio.wait_for(process.stdout.readuntil(b'\n'), timeout=2.0)
+        init_result = json.loads(response.decode())
+        
+        if "result" in init_result:
+            report.append(f"  ✓ Initialize OK")
             
-            # Send initialize
-            init_req = {
+            # Try tools/list
+            tools_req = {
                 "jsonrpc": "2.0",
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {},
-                    "clientInfo": {"name": "test", "version": "1.0"}
-                },
-                "id": 1
+                "method": "tools/list",
+                "id": 2
             }
             
-            process.stdin.write((json.dumps(init_req) + '\n').encode())
+            process.stdin.write((json.dumps(tools_req) + '\n').encode())
             await process.stdin.drain()
             
-            # Read response
-            response = await asyncio.wait_for(process.stdout.readline(), timeout=2.0)
-            init_result = json.loads(response.decode())
+            response = await asyncio.wait_for(process.stdout.readuntil(b'\n'), timeout=2.0)
+            tools_result = json.loads(response.decode())
             
-            if "result" in init_result:
-                print(f"  ✓ Initialize OK")
-                
-                # Try tools/list
-                tools_req = {
-                    "jsonrpc": "2.0",
-                    "method": "tools/list",
-                    "id": 2
-                }
-                
-                process.stdin.write((json.dumps(tools_req) + '\n').encode())
-                await process.stdin.drain()
-                
-                response = await asyncio.wait_for(process.stdout.readline(), timeout=2.0)
-                tools_result = json.loads(response.decode())
-                
-                if "result" in tools_result:
-                    print(f"  ✓ Tools/list OK - {len(tools_result['result'].get('tools', []))} tools")
-                else:
-                    print(f"  ✗ Tools/list failed: {tools_result}")
+            if "result" in tools_result:
+                report.append(f"  ✓ Tools/list OK - {len(tools_result['result'].get('tools', []))} tools")
             else:
-                print(f"  ✗ Initialize failed")
-                
-            process.terminate()
-            await process.wait()
+                report.append(f"  ✗ Tools/list failed: {tools_result}")
+        else:
+            report.append(f"  ✗ Initialize failed")
             
-        except Exception as e:
-            print(f"  ✗ Error: {e}")
+        process.terminate()
+        await process.wait()
+        
+    except Exception as e:
+        report.append(f"  ✗ Error: {e}")
+        
+    return report
+
+
+async def test_other_mcp_servers():
+    """Test if other MCP servers have the same issue"""
+    print("\n=== Testing other MCP servers ===\n")
+    
+    servers = ["memory", "developer", "tutorial"]
+    
+    # Probe all servers at once; wall time is bounded by the slowest one
+    reports = await asyncio.gather(*[probe_mcp_server(server) for server in servers])
+    
+    for report in reports:
+        print("\n".join(report))
 
 
 if __name__ == "__main__":
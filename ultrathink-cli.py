@@ -5,12 +5,46 @@ Integrates with Goose, Claude, and other AI systems
 """
 
 import os
+import io
 import sys
 import json
+import socket
+import struct
 import argparse
+import asyncio
+import signal
+import contextlib
+import socketserver
+from collections import Counter, defaultdict
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _loads(data: bytes):
+    """Decode JSON, with orjson when it is installed"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def _dumps(obj) -> bytes:
+    """Encode indented JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
+# Memories sent per POST /api/v1/sync request
+SYNC_BATCH_SIZE = 500
+
+# Unix socket served by `ultrathink-cli.py --daemon`
+DAEMON_SOCKET = Path.home() / ".goose" / "ultrathink.sock"
+# Seconds to wait for the daemon to take a command, and for a command to finish
+DAEMON_READY_TIMEOUT = 1.0
+DAEMON_TIMEOUT = 30.0
+# Commands that depend on the caller's environment always run in-process
+LOCAL_COMMANDS = {"sync"}
 
 class UltraThinkCLI:
     def __init__(self):
@@ -19,6 +53,13 @@ class UltraThinkCLI:
         self.todos_file = self.base_dir / "todos.json"
         self.projects = ["zgdk", "zagadka", "boht", "general"]
         
+        # Parsed todos and memory listings, reused while the mtimes are unchanged
+        self._todos_cache: Optional[Tuple[int, List[Dict]]] = None
+        self._memory_files_cache: Dict[Path, Tuple[Dict[str, int], List[str]]] = {}
+        
+        # Shared HTTP session, created on first use
+        self._session = None
+        
     def list_todos(self, project: Optional[str] = None, status: Optional[str] = None):
         """List todos, optionally filtered by project or status"""
         todos = self._load_todos()
@@ -95,29 +136,79 @@ class UltraThinkCLI:
         print(f"\n📚 Memories for: {project or 'all projects'}")
         print("-" * 50)
         
-        for file in memory_path.rglob("*.txt"):
-            rel_path = file.relative_to(self.memory_dir)
+        for file in self._memory_files(memory_path):
+            rel_path = os.path.relpath(file, self.memory_dir)
             print(f"\n📄 {rel_path}")
             with open(file, 'r') as f:
-                content = f.read()
+                # One character past the preview is enough to know it was cut
+                content = f.read(201)
                 if len(content) > 200:
                     content = content[:200] + "..."
                 print(f"   {content}")
                 
-    def sync_graphiti(self):
+    def _get_session(self):
+        """Return the shared aiohttp session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            import aiohttp
+            # One pooled connector so every request reuses keep-alive connections
+            connector = aiohttp.TCPConnector(limit=256, ttl_dns_cache=300,
+                                             keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+        
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            
+    async def sync_graphiti(self):
         """Sync with Graphiti knowledge graph"""
         graphiti_endpoint = os.environ.get("GRAPHITI_ENDPOINT", "http://localhost:8123")
         
         print(f"🔄 Syncing with Graphiti at {graphiti_endpoint}")
         
-        # TODO: Implement actual Graphiti sync
-        # For now, just show what would be synced
         todos = self._load_todos()
         print(f"  - {len(todos)} todos to sync")
         
-        memory_files = list(self.memory_dir.rglob("*.txt"))
+        memory_files = self._memory_files(self.memory_dir)
         print(f"  - {len(memory_files)} memory files to sync")
         
+        if not memory_files:
+            return
+            
+        try:
+            import aiohttp
+        except ImportError:
+            print("❌ aiohttp is required to sync with Graphiti")
+            return
+            
+        memories = []
+        for file in memory_files:
+            rel_parts = os.path.relpath(file, self.memory_dir).split(os.sep)
+            with open(file, 'r') as f:
+                content = f.read()
+            memories.append({
+                "content": content,
+                "project": rel_parts[0] if len(rel_parts) > 1 else "general",
+                "timestamp": datetime.fromtimestamp(os.path.getmtime(file)).isoformat()
+            })
+            
+        session = self._get_session()
+        synced = 0
+        try:
+            for start in range(0, len(memories), SYNC_BATCH_SIZE):
+                batch = memories[start:start + SYNC_BATCH_SIZE]
+                async with session.post(f"{graphiti_endpoint}/api/v1/sync",
+                                        json={"memories": batch}) as response:
+                    response.raise_for_status()
+                    synced += (await response.json()).get("synced", 0)
+        except aiohttp.ClientError as e:
+            print(f"❌ Sync failed: {e}")
+            return
+            
+        print(f"✅ Synced {synced} new memories")
+        
     def project_stats(self):
         """Show statistics for all projects"""
         todos = self._load_todos()
@@ -125,40 +216,99 @@ class UltraThinkCLI:
         print("\n📊 Project Statistics")
         print("-" * 50)
         
+        # Count statuses per project in a single pass
+        by_project = defaultdict(Counter)
+        for todo in todos:
+            by_project[todo.get("project")][todo["status"]] += 1
+            
         for project in self.projects:
-            project_todos = [t for t in todos if t.get("project") == project]
+            counts = by_project.get(project)
             
-            if project_todos:
-                pending = len([t for t in project_todos if t["status"] == "pending"])
-                in_progress = len([t for t in project_todos if t["status"] == "in_progress"])
-                completed = len([t for t in project_todos if t["status"] == "completed"])
-                
+            if counts:
                 print(f"\n🎯 {project}:")
-                print(f"   Pending: {pending}")
-                print(f"   In Progress: {in_progress}")
-                print(f"   Completed: {completed}")
-                print(f"   Total: {len(project_todos)}")
+                print(f"   Pending: {counts['pending']}")
+                print(f"   In Progress: {counts['in_progress']}")
+                print(f"   Completed: {counts['completed']}")
+                print(f"   Total: {sum(counts.values())}")
                 
-    def _load_todos(self) -> List[Dict]:
-        """Load todos from JSON file"""
-        if not self.todos_file.exists():
+    def _memory_files(self, memory_path: Path) -> List[str]:
+        """List memory file paths under a directory, reusing the listing until it changes"""
+        cached = self._memory_files_cache.get(memory_path)
+        if cached:
+            dir_mtimes, files = cached
+            try:
+                # Any added or removed entry bumps the mtime of its directory
+                if all(os.stat(d).st_mtime_ns == m for d, m in dir_mtimes.items()):
+                    return files
+            except FileNotFoundError:
+                pass
+                
+        if not memory_path.is_dir():
             return []
             
+        # Walk with scandir: DirEntry type checks come from the directory
+        # listing itself, so only directories need a stat (for the cache key)
+        dir_mtimes = {}
+        files = []
+        pending = [str(memory_path)]
+        while pending:
+            directory = pending.pop()
+            try:
+                dir_mtimes[directory] = os.stat(directory).st_mtime_ns
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.name.endswith(".txt"):
+                            files.append(entry.path)
+            except OSError:
+                continue
+                
+        self._memory_files_cache[memory_path] = (dir_mtimes, files)
+        return files
+        
+    def _load_todos(self) -> List[Dict]:
+        """Load todos from JSON file, skipping the parse if it is unchanged"""
         try:
-            with open(self.todos_file, 'r') as f:
-                return json.load(f)
-        except:
+            mtime = self.todos_file.stat().st_mtime_ns
+        except FileNotFoundError:
             return []
             
+        if self._todos_cache and self._todos_cache[0] == mtime:
+            todos = self._todos_cache[1]
+        else:
+            try:
+                with open(self.todos_file, 'rb') as f:
+                    todos = _loads(f.read())
+            except:
+                return []
+            self._todos_cache = (mtime, todos)
+            
+        # Callers edit todos in place before saving; copy them so the cache
+        # keeps matching the file if the save fails
+        return [dict(todo) for todo in todos]
+            
     def _save_todos(self, todos: List[Dict]):
         """Save todos to JSON file"""
         self.todos_file.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(self.todos_file, 'w') as f:
-            json.dump(todos, f, indent=2)
+        with open(self.todos_file, 'wb') as f:
+            f.write(_dumps(todos))
+            
+        self._todos_cache = (self.todos_file.stat().st_mtime_ns, todos)
 
-def main():
+async def _sync(cli: UltraThinkCLI):
+    """Run a Graphiti sync and release the HTTP session afterwards"""
+    try:
+        await cli.sync_graphiti()
+    finally:
+        await cli.close()
+
+def build_parser() -> Tuple[argparse.ArgumentParser, argparse.ArgumentParser]:
+    """Build the CLI parser, returning it with the todo subparser"""
     parser = argparse.ArgumentParser(description="UltraThink CLI - Manage todos and knowledge")
+    parser.add_argument("--daemon", action="store_true",
+                        help=f"Serve commands over {DAEMON_SOCKET} to skip startup cost")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
     
     # Todo commands
@@ -194,10 +344,11 @@ def main():
     # Stats command
     stats_parser = subparsers.add_parser("stats", help="Show project statistics")
     
-    args = parser.parse_args()
-    
-    cli = UltraThinkCLI()
-    
+    return parser, todo_parser
+
+def run_command(cli: UltraThinkCLI, args: argparse.Namespace,
+                parser: argparse.ArgumentParser, todo_parser: argparse.ArgumentParser):
+    """Dispatch parsed arguments to the matching CLI command"""
     if args.command == "todo":
         if args.todo_command == "list":
             cli.list_todos(args.project, args.status)
@@ -212,7 +363,7 @@ def main():
         cli.list_memories(args.project)
         
     elif args.command == "sync":
-        cli.sync_graphiti()
+        asyncio.run(_sync(cli))
         
     elif args.command == "stats":
         cli.project_stats()
@@ -220,5 +371,118 @@ def main():
     else:
         parser.print_help()
 
+def _send_frame(sock: socket.socket, payload: Dict):
+    """Send one length-prefixed JSON frame"""
+    body = json.dumps(payload).encode()
+    sock.sendall(struct.pack(">I", len(body)) + body)
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Read exactly size bytes or raise ConnectionError on EOF"""
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("daemon connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def _recv_frame(sock: socket.socket) -> Dict:
+    """Receive one length-prefixed JSON frame"""
+    (size,) = struct.unpack(">I", _recv_exact(sock, 4))
+    return json.loads(_recv_exact(sock, size))
+
+def _forward_to_daemon(argv: List[str]) -> Optional[Dict]:
+    """Run argv on a running daemon, or return None if none is ready for it"""
+    if not hasattr(socket, "AF_UNIX") or not DAEMON_SOCKET.exists():
+        return None
+        
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.settimeout(DAEMON_READY_TIMEOUT)
+            sock.connect(str(DAEMON_SOCKET))
+            # The daemon greets each connection it takes; if it is stuck on
+            # another command nothing has been sent yet, so run in-process
+            _recv_frame(sock)
+        except (OSError, ValueError):
+            return None
+            
+        try:
+            sock.settimeout(DAEMON_TIMEOUT)
+            _send_frame(sock, {"argv": argv})
+            return _recv_frame(sock)
+        except (OSError, ValueError) as e:
+            # The daemon may have run the command already, so don't repeat it
+            return {"stdout": "", "stderr": f"❌ UltraThink daemon did not answer: {e}\n", "code": 1}
+
+def serve_daemon():
+    """Serve CLI commands over a unix socket, keeping parser and caches warm"""
+    parser, todo_parser = build_parser()
+    cli = UltraThinkCLI()
+    
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            # Commands are served one at a time; don't let a silent client
+            # hold up the ones behind it
+            self.request.settimeout(DAEMON_TIMEOUT)
+            try:
+                _send_frame(self.request, {"ready": True})
+                argv = _recv_frame(self.request)["argv"]
+            except (OSError, ValueError, KeyError):
+                return
+            stdout, stderr = io.StringIO(), io.StringIO()
+            code = 0
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    run_command(cli, parser.parse_args(argv), parser, todo_parser)
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else int(e.code is not None)
+                except Exception as e:
+                    print(f"❌ {e}", file=sys.stderr)
+                    code = 1
+            try:
+                _send_frame(self.request, {"stdout": stdout.getvalue(),
+                                           "stderr": stderr.getvalue(),
+                                           "code": code})
+            except OSError:
+                pass
+            
+    DAEMON_SOCKET.parent.mkdir(parents=True, exist_ok=True)
+    if DAEMON_SOCKET.exists():
+        DAEMON_SOCKET.unlink()
+        
+    with socketserver.UnixStreamServer(str(DAEMON_SOCKET), Handler) as server:
+        os.chmod(DAEMON_SOCKET, 0o600)
+        # Exit through the finally below so the socket file is removed
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        print(f"🚀 UltraThink daemon listening on {DAEMON_SOCKET}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            DAEMON_SOCKET.unlink(missing_ok=True)
+
+def main():
+    argv = sys.argv[1:]
+    
+    # Hand the command to a warm daemon when one is running
+    command = next((arg for arg in argv if not arg.startswith("-")), None)
+    if "--daemon" not in argv and command not in LOCAL_COMMANDS:
+        reply = _forward_to_daemon(argv)
+        if reply is not None:
+            sys.stdout.write(reply["stdout"])
+            sys.stderr.write(reply["stderr"])
+            sys.exit(reply["code"])
+            
+    parser, todo_parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    if args.daemon:
+        serve_daemon()
+        return
+        
+    run_command(UltraThinkCLI(), args, parser, todo_parser)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
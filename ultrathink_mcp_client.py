@@ -7,22 +7,63 @@ Allows non-MCP AI systems (Gemini, OpenAI) to access UltraThink via MCP protocol
 import subprocess
 import json
 import asyncio
+import importlib.util
 import logging
-from typing import Dict, Any, Optional, List
+import re
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
 from datetime import datetime
 import uuid
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 logger = logging.getLogger(__name__)
 
+RETRIEVE_CACHE_SIZE = 256
+RETRIEVE_CACHE_TTL = 300.0  # seconds
+SEMANTIC_THRESHOLD = 0.85
+POOL_GRACE_PERIOD = 30.0  # seconds an unused pooled client stays connected
+
+# Messages mentioning any of these get their response stored as a memory
+_REMEMBER_RE = re.compile(r"remember|note|important", re.IGNORECASE)
+
+# API clients shared by every wrapper using the same key, so their
+# connection pools stay warm between sessions; an HTTP pool only works on
+# the loop that opened it, so each loop gets its own
+_OPENAI_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+_genai_api_key: Optional[str] = None
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+STREAM_CHUNK_SIZE = 64 * 1024
+
 class UltraThinkMCPClient:
     """MCP Client for UltraThink - enables Gemini/OpenAI to use shared memory"""
     
-    def __init__(self, project: str = "general"):
+    def __init__(self, project: str = "general", semantic_cache: bool = False):
         self.process = None
         self.project = project
         self.request_id = 0
         self._reader = None
         self._writer = None
+        # Bytes read past the end of a streamed response
+        self._leftover = b''
+        # (project, normalized query, limit) -> (expires_at, memories)
+        self._retrieve_cache: OrderedDict = OrderedDict()
+        self.semantic_cache = semantic_cache
+        self._embedder = None
+        # Semantic tier: one embedding row per cache slot, scanned with a single matmul
+        self._emb_matrix = None
+        self._emb_limits = None
+        self._emb_expiry = None
+        self._emb_keys: List[Optional[Tuple[str, str, int]]] = [None] * RETRIEVE_CACHE_SIZE
+        self._emb_slots: Dict[Tuple[str, str, int], int] = {}
+        self._tools_cache: Optional[List[Dict[str, Any]]] = None
+        # Responses are read in order, so one request at a time per connection
+        self._lock = asyncio.Lock()
         
     async def connect(self):
         """Start goose mcp ultrathink process and establish communication"""
@@ -45,6 +86,7 @@ class UltraThinkMCPClient:
         
         self._reader = self.process.stdout
         self._writer = self.process.stdin
+        self._leftover = b''
         
         # Initialize connection
         await self._initialize_connection()
@@ -68,13 +110,19 @@ class UltraThinkMCPClient:
         
     async def disconnect(self):
         """Close MCP connection"""
+        self._tools_cache = None
         if self.process:
-            self.process.terminate()
+            # goose may already have exited on its own
+            if self.process.returncode is None:
+                try:
+                    self.process.terminate()
+                except ProcessLookupError:
+                    pass
             await self.process.wait()
             logger.info("MCP connection closed")
             
-    async def _send_request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Send JSON-RPC request and wait for response"""
+    def _frame_request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes]:
+        """Build a JSON-RPC request, returning its id and the line to send"""
         self.request_id += 1
         
         request = {
@@ -86,28 +134,67 @@ class UltraThinkMCPClient:
         if params:
             request["params"] = params
             
-        # Send request
-        request_str = json.dumps(request) + '\n'
-        self._writer.write(request_str.encode())
-        await self._writer.drain()
-        
-        # Read response
-        response_data = await self._reader.readline()
-        if not response_data:
-            raise Exception("No response from MCP server")
+        return self.request_id, (json.dumps(request) + '\n').encode()
+        
+    def _as_response(self, line: bytes) -> Optional[Dict[str, Any]]:
+        """Parse a line from the server, or return None if it isn't a response"""
+        try:
+            message = json.loads(line)
+        except ValueError:
+            logger.debug(f"Skipping non-JSON output: {line!r}")
+            return None
+        # Notifications have no id; goose's error replies have id 0, so any id counts
+        if not isinstance(message, dict) or "id" not in message:
+            logger.debug(f"Skipping server message: {line!r}")
+            return None
+        return message
+        
+    async def _readline(self) -> bytes:
+        """Read one line, starting with any bytes a streamed read left over"""
+        if not self._leftover:
+            return await self._reader.readline()
             
-        response = json.loads(response_data.decode())
+        end = self._leftover.find(b'\n')
+        if end != -1:
+            line, self._leftover = self._leftover[:end + 1], self._leftover[end + 1:]
+            return line
+        line, self._leftover = self._leftover, b''
+        return line + await self._reader.readline()
+        
+    async def _send_request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send JSON-RPC request and wait for response"""
+        _, request_line = self._frame_request(method, params)
         
+        async with self._lock:
+            # Send request
+            self._writer.write(request_line)
+            await self._writer.drain()
+            
+            # Read response, skipping any log or notification lines before it
+            response = None
+            while response is None:
+                response_data = await self._readline()
+                if not response_data:
+                    raise Exception("No response from MCP server")
+                response = self._as_response(response_data)
+                
         # Check for errors
         if "error" in response:
             logger.error(f"MCP error: {response['error']}")
             
         return response
         
-    async def list_tools(self) -> List[Dict[str, Any]]:
-        """List available UltraThink tools"""
+    async def list_tools(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        """List available UltraThink tools (cached for the session)"""
+        if self._tools_cache is not None and not refresh:
+            return self._tools_cache
+            
         response = await self._send_request("tools/list")
-        return response.get("result", {}).get("tools", [])
+        tools = response.get("result", {}).get("tools", [])
+        # Don't cache a failed listing
+        if "error" not in response:
+            self._tools_cache = tools
+        return tools
         
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
         """Call a specific UltraThink tool"""
@@ -126,15 +213,132 @@ class UltraThinkMCPClient:
     async def remember(self, content: str, priority: str = "medium", 
                       tags: Optional[List[str]] = None) -> Dict[str, Any]:
         """Store a memory in UltraThink"""
-        return await self.call_tool("ultrathink_remember", {
-            "content": content,
-            "project": self.project,
-            "priority": priority,
-            "tags": tags or []
+        # A new memory can change any cached retrieve result
+        self._cache_clear()
+        try:
+            return await self.call_tool("ultrathink_remember", {
+                "content": content,
+                "project": self.project,
+                "priority": priority,
+                "tags": tags or []
+            })
+        finally:
+            # Drop results cached by retrieves that ran while the memory was
+            # being stored; the server may have stored it even if the call failed
+            self._cache_clear()
+        
+    async def retrieve(self, query: str, limit: int = 10, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Retrieve memories matching query, served from the LRU cache when possible"""
+        if not use_cache:
+            return await self._fetch_memories(query, limit)
+            
+        key = (self.project, query.strip().lower(), limit)
+        memories = self._cache_get(key)
+        if memories is not None:
+            return memories
+            
+        embedding = None
+        if self.semantic_cache:
+            embedding = await self._embed(key[1])
+            memories = self._semantic_get(embedding, limit)
+            if memories is not None:
+                return memories
+                
+        memories = await self._fetch_memories(query, limit)
+        self._cache_put(key, memories, embedding)
+        return memories
+        
+    async def retrieve_stream(self, query: str, limit: int = 10) -> AsyncIterator[Dict[str, Any]]:
+        """Yield memories matching query as they are parsed off the wire (needs ijson)"""
+        if ijson is None:
+            for memory in await self._fetch_memories(query, limit):
+                yield memory
+            return
+            
+        queue: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.ensure_future(self._stream_memories(query, limit, queue))
+        try:
+            while True:
+                memory = await queue.get()
+                if memory is None:
+                    break
+                yield memory
+            # Surface errors raised after the last memory
+            await reader
+        finally:
+            if not reader.done():
+                # The response line must still be read to keep the stream in sync
+                await asyncio.shield(reader)
+                
+    async def _stream_memories(self, query: str, limit: int, queue: asyncio.Queue):
+        """Send one retrieve request and stream its response into the queue"""
+        _, request_line = self._frame_request("tools/call", {
+            "name": "ultrathink_retrieve",
+            "arguments": {"query": query, "project": self.project, "limit": limit}
         })
         
-    async def retrieve(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Retrieve memories matching query"""
+        try:
+            async with self._lock:
+                self._writer.write(request_line)
+                await self._writer.drain()
+                
+                # Skip any log or notification lines before the response
+                while not await self._stream_line(queue):
+                    pass
+        finally:
+            queue.put_nowait(None)
+            
+    async def _stream_line(self, queue: asyncio.Queue) -> bool:
+        """Read one line in chunks, queueing each memory as ijson emits it
+        
+        Returns False if the line turned out not to be a response.
+        """
+        memories = ijson.sendable_list()
+        parser = ijson.items_coro(memories, "result.memories.item")
+        chunks = []
+        found = False
+        end = -1
+        while end == -1:
+            if self._leftover:
+                chunk, self._leftover = self._leftover, b''
+            else:
+                chunk = await self._reader.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    raise Exception("No response from MCP server")
+            end = chunk.find(b'\n')
+            if end != -1:
+                # Whatever follows the line is kept for the next read
+                chunk, self._leftover = chunk[:end], chunk[end + 1:]
+            if not found:
+                chunks.append(chunk)
+            if parser is None:
+                continue
+                
+            try:
+                parser.send(chunk)
+                if end != -1:
+                    parser.close()
+            except ijson.JSONError:
+                # Not JSON; read past the rest of the line
+                parser = None
+            for memory in memories:
+                found = True
+                queue.put_nowait(memory)
+            del memories[:]
+            
+        if found:
+            return True
+            
+        response = self._as_response(b''.join(chunks))
+        if response is None:
+            return False
+        if "error" in response:
+            logger.error(f"MCP error: {response['error']}")
+            raise Exception(f"Tool call failed: {response['error']}")
+        return True
+        
+    async def _fetch_memories(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Retrieve memories from the MCP server"""
         result = await self.call_tool("ultrathink_retrieve", {
             "query": query,
             "project": self.project,
@@ -142,6 +346,77 @@ class UltraThinkMCPClient:
         })
         return result.get("memories", [])
         
+    def _cache_get(self, key) -> Optional[List[Dict[str, Any]]]:
+        """Return a fresh exact-match cache entry, dropping it if expired"""
+        entry = self._retrieve_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._cache_drop(key)
+            return None
+        self._retrieve_cache.move_to_end(key)
+        return entry[1]
+        
+    def _cache_put(self, key, memories: List[Dict[str, Any]], embedding=None):
+        """Store a retrieve result, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + RETRIEVE_CACHE_TTL
+        self._retrieve_cache[key] = (expires_at, memories)
+        self._retrieve_cache.move_to_end(key)
+        if len(self._retrieve_cache) > RETRIEVE_CACHE_SIZE:
+            self._cache_drop(next(iter(self._retrieve_cache)))
+            
+        if embedding is not None:
+            slot = self._emb_slots.get(key)
+            if slot is None:
+                slot = self._emb_keys.index(None)
+                self._emb_slots[key] = slot
+                self._emb_keys[slot] = key
+            self._emb_matrix[slot] = embedding
+            self._emb_limits[slot] = key[2]
+            self._emb_expiry[slot] = expires_at
+            
+    def _cache_drop(self, key):
+        """Remove one cache entry and free its embedding slot"""
+        del self._retrieve_cache[key]
+        slot = self._emb_slots.pop(key, None)
+        if slot is not None:
+            self._emb_keys[slot] = None
+            self._emb_limits[slot] = -1
+            
+    def _cache_clear(self):
+        """Remove every cache entry"""
+        self._retrieve_cache.clear()
+        self._emb_slots.clear()
+        self._emb_keys = [None] * RETRIEVE_CACHE_SIZE
+        if self._emb_limits is not None:
+            self._emb_limits.fill(-1)
+            
+    def _semantic_get(self, embedding, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached result of the most similar earlier query above the threshold"""
+        # Embeddings are normalized, so the dot product is the cosine similarity
+        sims = self._emb_matrix @ embedding
+        # Free slots have limit -1, so this also masks them out
+        sims[(self._emb_limits != limit) | (self._emb_expiry < time.monotonic())] = -1.0
+        slot = int(sims.argmax())
+        if sims[slot] < SEMANTIC_THRESHOLD:
+            return None
+            
+        key = self._emb_keys[slot]
+        self._retrieve_cache.move_to_end(key)
+        return self._retrieve_cache[key][1]
+        
+    async def _embed(self, text: str):
+        """Embed a query with sentence-transformers, loading the model on first use"""
+        if self._embedder is None:
+            import numpy as np
+            from sentence_transformers import SentenceTransformer
+            self._embedder = await asyncio.to_thread(SentenceTransformer, EMBEDDING_MODEL)
+            dim = self._embedder.get_sentence_embedding_dimension()
+            self._emb_matrix = np.zeros((RETRIEVE_CACHE_SIZE, dim), dtype=np.float32)
+            self._emb_limits = np.full(RETRIEVE_CACHE_SIZE, -1, dtype=np.int64)
+            self._emb_expiry = np.zeros(RETRIEVE_CACHE_SIZE)
+        return await asyncio.to_thread(self._embedder.encode, text, normalize_embeddings=True)
+        
     async def sequence(self, thought: str, context: Optional[str] = None) -> Dict[str, Any]:
         """Add a sequential thought"""
         return await self.call_tool("ultrathink_sequence", {
@@ -157,47 +432,180 @@ class UltraThinkMCPClient:
         })
 
 
+class UltraThinkClientPool:
+    """Shares one connected UltraThinkMCPClient per project across sessions
+    
+    Clients are bound to the event loop that connected them, so each running
+    loop gets its own. Idle clients are disconnected after the grace period,
+    or when asyncio.run() cancels their timers at loop shutdown; call
+    close() before the loop ends to disconnect the rest.
+    """
+    
+    def __init__(self, grace_period: float = POOL_GRACE_PERIOD):
+        self.grace_period = grace_period
+        # (loop, project) -> (client, reference count)
+        self._clients: Dict[Tuple[asyncio.AbstractEventLoop, str], Tuple[UltraThinkMCPClient, int]] = {}
+        self._closers: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Task] = {}
+        self._locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+        
+    def _lock(self) -> asyncio.Lock:
+        """The running loop's pool lock"""
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+        
+    async def acquire(self, project: str) -> UltraThinkMCPClient:
+        """Return the project's client, connecting it on first use"""
+        key = (asyncio.get_running_loop(), project)
+        async with self._lock():
+            closer = self._closers.pop(key, None)
+            if closer:
+                closer.cancel()
+                
+            if key in self._clients:
+                client, refs = self._clients[key]
+                if client.process.returncode is not None:
+                    # goose died; restart it under the same client so sessions
+                    # still holding it recover too
+                    logger.warning(f"Pooled MCP client for {project} exited, reconnecting")
+                    await client.connect()
+            else:
+                client, refs = UltraThinkMCPClient(project), 0
+                await client.connect()
+                
+            self._clients[key] = (client, refs + 1)
+            return client
+            
+    async def release(self, project: str):
+        """Drop a reference; the last one disconnects after the grace period"""
+        key = (asyncio.get_running_loop(), project)
+        async with self._lock():
+            client, refs = self._clients[key]
+            self._clients[key] = (client, refs - 1)
+            if refs == 1:
+                self._closers[key] = asyncio.create_task(self._close_later(key))
+                
+    def _take_idle(self, key) -> Optional[UltraThinkMCPClient]:
+        """Unregister a client nobody holds, returning it for disconnecting"""
+        client, refs = self._clients[key]
+        if refs > 0:
+            return None
+        del self._clients[key]
+        self._closers.pop(key, None)
+        return client
+        
+    async def _close_later(self, key):
+        """Disconnect an idle client unless it is acquired again in the meantime"""
+        try:
+            await asyncio.sleep(self.grace_period)
+        except asyncio.CancelledError:
+            # acquire() and close() unregister the timer before cancelling it,
+            # so a timer still registered is being cancelled by loop shutdown
+            if self._closers.get(key) is asyncio.current_task():
+                client = self._take_idle(key)
+                if client:
+                    await client.disconnect()
+            raise
+            
+        async with self._lock():
+            client = self._take_idle(key)
+        if client:
+            await client.disconnect()
+        
+    async def close(self):
+        """Disconnect every client pooled for the running loop immediately"""
+        loop = asyncio.get_running_loop()
+        async with self._lock():
+            keys = [key for key in self._clients if key[0] is loop]
+            for key in keys:
+                closer = self._closers.pop(key, None)
+                if closer:
+                    closer.cancel()
+            clients = [self._clients.pop(key)[0] for key in keys]
+        for client in clients:
+            await client.disconnect()
+
+client_pool = UltraThinkClientPool()
+
+
+def _abandon(task: asyncio.Future):
+    """Cancel a task whose result is no longer wanted"""
+    task.cancel()
+    # It may already have failed; mark the error as retrieved
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+
+async def _generate_with_memories(memories_coro, generate, build, speculative: bool):
+    """Build the model request from retrieved memories and run it
+    
+    With speculative=True the memory-less request runs while memories are
+    being retrieved, and is only redone if retrieval actually finds some.
+    """
+    if not speculative:
+        return await generate(build(await memories_coro))
+        
+    retrieve_task = asyncio.ensure_future(memories_coro)
+    llm_task = asyncio.ensure_future(generate(build([])))
+    try:
+        memories = await retrieve_task
+    except BaseException:
+        _abandon(llm_task)
+        raise
+        
+    if not memories:
+        return await llm_task
+    _abandon(llm_task)
+    return await generate(build(memories))
+
+
 # Example integrations
 
 class GeminiUltraThink:
     """Gemini integration with UltraThink memory"""
     
     def __init__(self, gemini_api_key: str, project: str = "general"):
+        global _genai_api_key
         import google.generativeai as genai
-        genai.configure(api_key=gemini_api_key)
+        # genai.configure is process-wide; only redo it when the key changes
+        if _genai_api_key != gemini_api_key:
+            genai.configure(api_key=gemini_api_key)
+            _genai_api_key = gemini_api_key
         self.model = genai.GenerativeModel('gemini-pro')
-        self.mcp_client = UltraThinkMCPClient(project)
+        self.mcp_client = None
         self.project = project
         
     async def __aenter__(self):
-        await self.mcp_client.connect()
+        self.mcp_client = await client_pool.acquire(self.project)
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.mcp_client.disconnect()
-        
-    async def chat(self, message: str, remember_response: bool = True) -> str:
-        """Chat with Gemini using UltraThink memory context"""
-        # Retrieve relevant memories
-        memories = await self.mcp_client.retrieve(message, limit=5)
+        await client_pool.release(self.project)
+        self.mcp_client = None
         
-        # Build context prompt
-        context_parts = [f"Project: {self.project}"]
+    def _build_prompt(self, message: str, memories: List[Dict[str, Any]]) -> str:
+        """Build the prompt with project and memory context"""
+        context = f"Project: {self.project}"
         
         if memories:
-            context_parts.append("\nRelevant memories:")
-            for mem in memories:
-                context_parts.append(f"- {mem['content']}")
-                
-        context = "\n".join(context_parts)
+            context += "\n\nRelevant memories:\n" + "\n".join(f"- {mem['content']}" for mem in memories)
+            
+        return f"{context}\n\nUser: {message}\n\nAssistant:"
         
-        # Generate response with context
-        full_prompt = f"{context}\n\nUser: {message}\n\nAssistant:"
-        response = self.model.generate_content(full_prompt)
+    async def chat(self, message: str, remember_response: bool = True,
+                   speculative: bool = False) -> str:
+        """Chat with Gemini using UltraThink memory context"""
+        # Retrieve relevant memories and generate response with context
+        response = await _generate_with_memories(
+            self.mcp_client.retrieve(message, limit=5),
+            self.model.generate_content_async,
+            lambda memories: self._build_prompt(message, memories),
+            speculative
+        )
         
         # Store important information
-        if remember_response and any(keyword in message.lower() 
-                                    for keyword in ["remember", "note", "important"]):
+        if remember_response and _REMEMBER_RE.search(message):
             await self.mcp_client.remember(
                 f"User asked: {message}\nResponse: {response.text}",
                 priority="high"
@@ -211,25 +619,33 @@ class OpenAIUltraThink:
     
     def __init__(self, openai_api_key: str, project: str = "general", 
                  model: str = "gpt-4"):
-        from openai import AsyncOpenAI
-        self.client = AsyncOpenAI(api_key=openai_api_key)
+        # Fail at construction, not on the first chat, if the SDK is missing
+        if importlib.util.find_spec("openai") is None:
+            raise ModuleNotFoundError("No module named 'openai'", name="openai")
+        self._api_key = openai_api_key
         self.model = model
-        self.mcp_client = UltraThinkMCPClient(project)
+        self.mcp_client = None
         self.project = project
         
+    @property
+    def client(self):
+        """The AsyncOpenAI client shared by wrappers with this key on the running loop"""
+        from openai import AsyncOpenAI
+        clients = _OPENAI_CLIENTS.setdefault(asyncio.get_running_loop(), {})
+        if self._api_key not in clients:
+            clients[self._api_key] = AsyncOpenAI(api_key=self._api_key)
+        return clients[self._api_key]
+        
     async def __aenter__(self):
-        await self.mcp_client.connect()
+        self.mcp_client = await client_pool.acquire(self.project)
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.mcp_client.disconnect()
-        
-    async def chat(self, message: str, remember_response: bool = True) -> str:
-        """Chat with OpenAI using UltraThink memory context"""
-        # Retrieve relevant memories
-        memories = await self.mcp_client.retrieve(message, limit=5)
+        await client_pool.release(self.project)
+        self.mcp_client = None
         
-        # Build messages array
+    def _build_messages(self, message: str, memories: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Build the messages array with memories as system context"""
         messages = [
             {
                 "role": "system",
@@ -239,24 +655,34 @@ class OpenAIUltraThink:
         
         # Add memories as system context
         if memories:
-            memory_content = "Relevant memories:\n"
-            for mem in memories:
-                memory_content += f"- {mem['content']}\n"
+            memory_content = "Relevant memories:\n" + "".join(f"- {mem['content']}\n" for mem in memories)
             messages.append({"role": "system", "content": memory_content})
             
         messages.append({"role": "user", "content": message})
+        return messages
         
-        # Get response
-        response = await self.client.chat.completions.create(
+    async def _complete(self, messages: List[Dict[str, str]]):
+        """Get a chat completion for the messages"""
+        return await self.client.chat.completions.create(
             model=self.model,
             messages=messages
         )
         
+    async def chat(self, message: str, remember_response: bool = True,
+                   speculative: bool = False) -> str:
+        """Chat with OpenAI using UltraThink memory context"""
+        # Retrieve relevant memories and get response
+        response = await _generate_with_memories(
+            self.mcp_client.retrieve(message, limit=5),
+            self._complete,
+            lambda memories: self._build_messages(message, memories),
+            speculative
+        )
+        
         response_text = response.choices[0].message.content
         
         # Store important information
-        if remember_response and any(keyword in message.lower() 
-                                    for keyword in ["remember", "note", "important"]):
+        if remember_response and _REMEMBER_RE.search(message):
             await self.mcp_client.remember(
                 f"User asked: {message}\nResponse: {response_text}",
                 priority="high"
@@ -8,10 +8,31 @@ import subprocess
 import json
 import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 import uuid
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _loads(data: bytes):
+    """Decode JSON, with orjson when it is installed"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def _canonical(obj) -> bytes:
+    """Encode JSON with sorted keys, so equal params give equal bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True).encode()
+
+def _dumps_line(obj) -> bytes:
+    """Encode one newline-terminated JSON-RPC message"""
+    if orjson is not None:
+        return orjson.dumps(obj) + b'\n'
+    return (json.dumps(obj) + '\n').encode()
+
 # Enhanced logging
 logging.basicConfig(
     level=logging.DEBUG,
@@ -19,6 +40,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# goose frames stdio messages one JSON object per line; frames are cut out
+# of READ_CHUNK_SIZE reads, and a frame longer than READ_LIMIT is dropped
+READ_CHUNK_SIZE = 64 * 1024
+READ_LIMIT = 8 * 1024 * 1024
+
+# Requests allowed to wait on a response at once, and notifications kept unread
+MAX_INFLIGHT = 256
+MAX_NOTIFICATIONS = 1024
+# Seconds to wait for the server to accept a request before giving up
+WRITE_TIMEOUT = 5.0
+
+# Tool calls with side effects are never merged with an identical in-flight call
+MUTATING_TOOLS = frozenset({"ultrathink_remember", "ultrathink_sequence", "ultrathink_graphiti_sync"})
+
 class UltraThinkMCPClient:
     """Fixed MCP Client with better protocol handling"""
     
@@ -28,11 +63,16 @@ class UltraThinkMCPClient:
         self.request_id = 0
         self._reader = None
         self._writer = None
-        self._response_buffer = []
+        self._pending: Dict[int, asyncio.Future] = {}
+        self.notifications: asyncio.Queue = asyncio.Queue(maxsize=MAX_NOTIFICATIONS)
+        self._inflight_limit = asyncio.Semaphore(MAX_INFLIGHT)
+        # Batches take their permits one batch at a time; see batch_call
+        self._batch_permits = asyncio.Lock()
+        self._inflight: Dict[Tuple[str, bytes], asyncio.Task] = {}
         self._initialized = False
         
     async def connect(self):
-        """Start goose mcp ultrathink process and establish communication"""
+        """Start goose mcp ultrathink process; the session is ready once this returns"""
         logger.info(f"Starting UltraThink MCP connection for project: {self.project}")
         
         # Set environment for project context
@@ -61,41 +101,93 @@ class UltraThinkMCPClient:
         
     async def _background_reader(self):
         """Continuously read from stdout and buffer responses"""
+        buffer = bytearray()
+        discarding = False
         try:
             while True:
-                line = await self._reader.readline()
-                if not line:
+                chunk = await self._reader.read(READ_CHUNK_SIZE)
+                if not chunk:
                     break
                     
-                try:
-                    data = json.loads(line.decode().strip())
-                    logger.debug(f"Received: {data}")
-                    self._response_buffer.append(data)
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse JSON: {line.decode().strip()}")
-                except Exception as e:
-                    logger.error(f"Reader error: {e}")
+                # Only the new chunk can hold the end of the pending frame
+                scan_from = len(buffer)
+                buffer += chunk
+                start = 0
+                end = buffer.find(b'\n', scan_from)
+                while end != -1:
+                    if discarding:
+                        discarding = False
+                    else:
+                        self._handle_frame(buffer[start:end])
+                    start = end + 1
+                    end = buffer.find(b'\n', start)
+                    
+                # Keep the trailing partial frame for the next read
+                if start:
+                    del buffer[:start]
+                if len(buffer) > READ_LIMIT:
+                    if not discarding:
+                        logger.warning(f"Dropped response larger than {READ_LIMIT} bytes")
+                    discarding = True
+                    buffer.clear()
         except Exception as e:
             logger.error(f"Background reader crashed: {e}")
+        finally:
+            # Fail anything still waiting instead of letting it run into the timeout
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(Exception("MCP connection closed"))
     
-    async def _wait_for_response(self, expected_id: int, timeout: float = 5.0) -> Dict[str, Any]:
-        """Wait for a response with specific ID"""
-        start_time = asyncio.get_event_loop().time()
-        
-        while True:
-            # Check timeout
-            if asyncio.get_event_loop().time() - start_time > timeout:
-                raise TimeoutError(f"Timeout waiting for response with ID {expected_id}")
+    def _handle_frame(self, frame: bytearray):
+        """Parse one response line and dispatch the message(s) in it"""
+        try:
+            # Parse the raw bytes, no decode/strip copies needed
+            data = _loads(frame)
+            logger.debug(f"Received: {data}")
+            # A batch request is answered with an array of responses
+            for message in (data if isinstance(data, list) else [data]):
+                self._dispatch(message)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Failed to parse JSON: {frame.decode(errors='replace').strip()}")
+        except Exception as e:
+            logger.error(f"Reader error: {e}")
+            
+    def _dispatch(self, message: Dict[str, Any]):
+        """Resolve the future waiting on this message's ID, or queue it as a notification"""
+        future = self._pending.get(message.get("id"))
+        if future is None:
+            if self.notifications.full():
+                logger.warning("Notification queue full, dropping oldest notification")
+                self.notifications.get_nowait()
+            self.notifications.put_nowait(message)
+        elif not future.done():
+            future.set_result(message)
             
-            # Check buffer for our response
-            for i, response in enumerate(self._response_buffer):
-                if response.get("id") == expected_id:
-                    # Found it, remove from buffer and return
-                    self._response_buffer.pop(i)
-                    return response
+    async def _send_expecting(self, request: Any, request_ids: List[int]):
+        """Register futures for request_ids and send, unregistering them if the send fails"""
+        for request_id in request_ids:
+            self._expect_response(request_id)
+        try:
+            await self._send_raw(request)
+        except BaseException:
+            for request_id in request_ids:
+                self._pending.pop(request_id, None)
+            raise
             
-            # Wait a bit before checking again
-            await asyncio.sleep(0.01)
+    def _expect_response(self, request_id: int) -> asyncio.Future:
+        """Register a future for a request ID; must be called before the request is sent"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        return future
+    
+    async def _wait_for_response(self, expected_id: int, timeout: float = 5.0) -> Dict[str, Any]:
+        """Wait for a response with specific ID"""
+        try:
+            return await asyncio.wait_for(self._pending[expected_id], timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timeout waiting for response with ID {expected_id}")
+        finally:
+            self._pending.pop(expected_id, None)
             
     async def _initialize_connection(self):
         """Send initialize request to establish MCP session"""
@@ -117,7 +209,7 @@ class UltraThinkMCPClient:
         }
         
         # Send request
-        await self._send_raw(request)
+        await self._send_expecting(request, [init_id])
         
         # Wait for response
         response = await self._wait_for_response(init_id)
@@ -129,12 +221,11 @@ class UltraThinkMCPClient:
         logger.info(f"MCP connection initialized: {response.get('result', {}).get('serverInfo', {})}")
         return response
         
-    async def _send_raw(self, request: Dict[str, Any]):
-        """Send raw JSON-RPC request"""
-        request_str = json.dumps(request) + '\n'
+    async def _send_raw(self, request: Any):
+        """Send raw JSON-RPC request (a dict, or a list for a batch)"""
         logger.debug(f"Sending: {request}")
-        self._writer.write(request_str.encode())
-        await self._writer.drain()
+        self._writer.write(_dumps_line(request))
+        await asyncio.wait_for(self._writer.drain(), WRITE_TIMEOUT)
         
     async def disconnect(self):
         """Close MCP connection"""
@@ -144,33 +235,101 @@ class UltraThinkMCPClient:
             logger.info("MCP connection closed")
             
     async def _send_request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send JSON-RPC request, sharing the response with identical in-flight requests"""
+        if method == "tools/call" and (params or {}).get("name") in MUTATING_TOOLS:
+            return await self._request(method, params)
+            
+        key = (method, _canonical(params))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._request(method, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(key, done))
+            
+        # Shield so one caller being cancelled doesn't fail the others
+        return await asyncio.shield(task)
+        
+    def _finish_inflight(self, key: Tuple[str, bytes], task: asyncio.Task):
+        """Forget a finished coalesced request"""
+        self._inflight.pop(key, None)
+        # Every waiter may have been cancelled; mark the error as retrieved
+        if not task.cancelled():
+            task.exception()
+            
+    async def _request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Send JSON-RPC request and wait for response"""
         if not self._initialized and method != "initialize":
             raise Exception("MCP connection not initialized")
             
-        self.request_id += 1
-        current_id = self.request_id
-        
-        request = {
-            "jsonrpc": "2.0",
-            "method": method,
-            "id": current_id
-        }
-        
-        if params:
-            request["params"] = params
+        # Wait for a slot so a stalled server can't accumulate unbounded pending requests
+        async with self._inflight_limit:
+            self.request_id += 1
+            current_id = self.request_id
             
-        # Send request
-        await self._send_raw(request)
-        
-        # Wait for response
-        response = await self._wait_for_response(current_id)
-        
-        # Check for errors
-        if "error" in response:
-            logger.error(f"MCP error: {response['error']}")
+            request = {
+                "jsonrpc": "2.0",
+                "method": method,
+                "id": current_id
+            }
             
-        return response
+            if params:
+                request["params"] = params
+                
+            # Send request
+            await self._send_expecting(request, [current_id])
+            
+            # Wait for response
+            response = await self._wait_for_response(current_id)
+            
+            # Check for errors
+            if "error" in response:
+                logger.error(f"MCP error: {response['error']}")
+                
+            return response
+        
+    async def batch_call(self, calls: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """Send (method, params) calls as one JSON-RPC batch, returning responses in order"""
+        if not self._initialized:
+            raise Exception("MCP connection not initialized")
+        if len(calls) > MAX_INFLIGHT:
+            raise Exception(f"Batch of {len(calls)} calls exceeds MAX_INFLIGHT ({MAX_INFLIGHT})")
+            
+        acquired = 0
+        try:
+            # Two batches each holding part of the limit while waiting for the
+            # rest would deadlock, so only one gathers its permits at a time
+            async with self._batch_permits:
+                for _ in calls:
+                    await self._inflight_limit.acquire()
+                    acquired += 1
+            return await self._send_batch(calls)
+        finally:
+            for _ in range(acquired):
+                self._inflight_limit.release()
+                
+    async def _send_batch(self, calls: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """Write a JSON-RPC batch and gather its responses"""
+        batch = []
+        for method, params in calls:
+            self.request_id += 1
+            request = {
+                "jsonrpc": "2.0",
+                "method": method,
+                "id": self.request_id
+            }
+            if params:
+                request["params"] = params
+            batch.append(request)
+            
+        # One write for the whole batch, then collect each reply by id
+        await self._send_expecting(batch, [r["id"] for r in batch])
+        responses = await asyncio.gather(*[self._wait_for_response(r["id"]) for r in batch])
+        
+        for response in responses:
+            if "error" in response:
+                logger.error(f"MCP error: {response['error']}")
+                
+        return list(responses)
         
     async def list_tools(self) -> List[Dict[str, Any]]:
         """List available UltraThink tools"""
@@ -237,9 +396,6 @@ async def test_ultrathink_mcp_fixed():
         await client.connect()
         print("✓ Connected to UltraThink MCP")
         
-        # Small delay to ensure initialization completes
-        await asyncio.sleep(0.5)
-        
         # List tools
         print("\nListing tools...")
         tools = await client.list_tools()
@@ -281,7 +437,7 @@ class SimpleGeminiWrapper:
         # In real implementation, this would use Gemini API
         # For now, it's a placeholder showing the concept
         
-    async def chat(self, message: str) -> str:
+    async def chat(self, message: str, timeout: float = 30.0) -> str:
         """Chat using goose as intermediary"""
         # This would run: goose chat --project zgdk "message"
         # And parse the response
@@ -292,16 +448,16 @@ class SimpleGeminiWrapper:
             stderr=asyncio.subprocess.PIPE
         )
         
-        # Send message
-        process.stdin.write(f"{message}\n".encode())
-        await process.stdin.drain()
-        
-        # Read response (simplified - real implementation would be more robust)
-        response = await process.stdout.read(1024)
-        
-        process.terminate()
-        await process.wait()
-        
+        # Send message, close stdin so goose exits, and read the full response
+        try:
+            response, _ = await asyncio.wait_for(
+                process.communicate(input=f"{message}\n".encode()), timeout
+            )
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise TimeoutError(f"goose chat did not answer within {timeout}s")
+            
         return response.decode()
 
 
@@ -8,135 +8,431 @@ import subprocess
 import json
 import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+import os
+import shutil
+import socket
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Sequence
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+def _loads(data):
+    """Decode JSON from bytes or a memoryview, with orjson when it is installed"""
+    return orjson.loads(data) if orjson is not None else json.loads(bytes(data))
+
+def _dumps(obj) -> bytes:
+    """Encode compact JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+# Requests whose body never changes, pre-serialized with a slot for the id
+_INIT_TEMPLATE = (b'{"jsonrpc":"2.0","method":"initialize","params":{"protocolVersion":"2024-11-05",'
+                  b'"capabilities":{},"clientInfo":{"name":"ultrathink-mcp-client-v2","version":"2.0.0"}},'
+                  b'"id":%d}')
+_LIST_TOOLS_TEMPLATE = b'{"jsonrpc":"2.0","method":"tools/list","id":%d}'
+# tools/call for the known UltraThink tools, with slots for the arguments and id
+_TOOL_CALL_TEMPLATES = {
+    name: (b'{"jsonrpc":"2.0","method":"tools/call","params":{"name":"' + name.encode()
+           + b'","arguments":%s},"id":%d}')
+    for name in ("ultrathink_remember", "ultrathink_retrieve",
+                 "ultrathink_sequence", "ultrathink_graphiti_sync")
+}
+
+# Handshake metadata cached in MEMORY_DIR, valid while the goose binary is unchanged
+HANDSHAKE_CACHE = ".mcp_handshake.json"
+
+# Shared default for remember(); JSON encodes tuples as arrays
+_EMPTY_TAGS: tuple = ()
+
+RETRIEVE_CACHE_SIZE = 256
+RETRIEVE_CACHE_TTL = 30.0  # seconds
+
+# stdin transport watermarks; the batcher only drains above the low one
+WRITE_BUFFER_HIGH = 256 * 1024
+WRITE_BUFFER_LOW = 64 * 1024
+
+# Initial size of the recycled stdout receive buffer; grows for larger frames
+READ_BUFFER_SIZE = 64 * 1024
+
+# Notifications the MCP server handles without replying. goose answers any
+# other method with an ID 0 error, which would be taken for the reply to the
+# oldest pending request
+NOTIFY_METHODS = {
+    "notifications/initialized",
+    "notifications/cancelled",
+    "notifications/progress",
+    "notifications/roots/list_changed",
+}
+
+REQUEST_TIMEOUT = 120.0  # seconds, per MCP request
+CHAT_TIMEOUT = 120.0  # seconds, per goose chat message
+# Seconds goose gets to exit on its own after stdin closes
+SHUTDOWN_TIMEOUT = 2.0
+
+
+class _MCPProtocol(asyncio.BufferedProtocol):
+    """Cuts newline-delimited JSON-RPC frames out of a recycled receive buffer"""
+    
+    def __init__(self, client: "UltraThinkMCPClientV2"):
+        self._client = client
+        self._buffer = bytearray(READ_BUFFER_SIZE)
+        self._view = memoryview(self._buffer)
+        self._used = 0
+        
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self._used == len(self._buffer):
+            # A frame larger than the buffer; the view must be released before resizing
+            self._view.release()
+            self._buffer.extend(bytes(len(self._buffer)))
+            self._view = memoryview(self._buffer)
+        return self._view[self._used:]
+        
+    def buffer_updated(self, nbytes: int):
+        # Only the newly received bytes can contain a new frame end
+        scan_from = self._used
+        self._used += nbytes
+        
+        frame_start = 0
+        end = self._buffer.find(b'\n', scan_from, self._used)
+        while end != -1:
+            # Parsed before the buffer is reused, so no copy of the frame is needed
+            self._client._dispatch(self._view[frame_start:end])
+            frame_start = end + 1
+            end = self._buffer.find(b'\n', frame_start, self._used)
+            
+        if frame_start:
+            # Move the partial frame to the front of the buffer
+            remaining = self._used - frame_start
+            self._buffer[:remaining] = self._view[frame_start:self._used]
+            self._used = remaining
+            
+    def connection_made(self, transport):
+        self._transport = transport
+        
+    def eof_received(self):
+        return False
+        
+    def connection_lost(self, exc: Optional[Exception]):
+        # Ignore the old socket closing after the client has reconnected
+        if self._client._transport is self._transport:
+            self._client._fail_pending(exc or Exception("No response from MCP server"))
+
+
 class UltraThinkMCPClientV2:
     """MCP Client with workaround for ID 0 error responses"""
     
-    def __init__(self, project: str = "general"):
+    def __init__(self, project: str = "general", batch_requests: bool = False):
         self.process = None
         self.project = project
         self.request_id = 0
-        self._reader = None
+        self._transport = None
         self._writer = None
-        self._pending_requests = {}  # Track pending requests by ID
+        self._pending_requests: "OrderedDict[int, Optional[asyncio.Future]]" = OrderedDict()  # Track pending requests by ID, oldest first; None marks one given up on
+        # Requests queued in the same loop tick go out in one write; as a
+        # JSON-RPC array only if batch_requests is set, since goose may not
+        # accept arrays
+        self.batch_requests = batch_requests
+        self._send_queue: asyncio.Queue = asyncio.Queue()
+        self._batcher = None
+        self._memory_dir = f"/home/ubuntu/.goose/memory/{project}"
+        # Environment for project context, built once since project is fixed
+        self._env = {**os.environ, "GOOSE_PROJECT": project, "MEMORY_DIR": self._memory_dir}
+        self._init_result: Dict[str, Any] = {}
+        self._cached_tools: Optional[List[Dict[str, Any]]] = None
+        # (project, query, limit) -> (fetched_at, memories)
+        self._retrieve_cache: OrderedDict = OrderedDict()
         self._initialized = False
+        # Set once the server's stdout closes or disconnect() runs
+        self._closed = False
         
     async def connect(self):
         """Start goose mcp ultrathink process and establish communication"""
         logger.info(f"Starting UltraThink MCP connection for project: {self.project}")
         
-        # Set environment for project context
-        import os
-        env = os.environ.copy()
-        env["GOOSE_PROJECT"] = self.project
-        env["MEMORY_DIR"] = f"/home/ubuntu/.goose/memory/{self.project}"
-        
-        # Start the MCP server process
-        self.process = await asyncio.create_subprocess_exec(
-            'goose', 'mcp', 'ultrathink',
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env=env
+        # Start the MCP server process with stdout on a socket: socket transports
+        # support BufferedProtocol (pipe transports don't), so responses are
+        # received straight into the protocol's buffer
+        parent_sock, child_sock = socket.socketpair()
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                'goose', 'mcp', 'ultrathink',
+                stdin=asyncio.subprocess.PIPE,
+                stdout=child_sock.fileno(),
+                stderr=asyncio.subprocess.PIPE,
+                env=self._env
+            )
+        except BaseException:
+            parent_sock.close()
+            raise
+        finally:
+            child_sock.close()
+            
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.connect_accepted_socket(
+            lambda: _MCPProtocol(self), parent_sock
         )
-        
-        self._reader = self.process.stdout
         self._writer = self.process.stdin
+        self._closed = False
+        self._writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH, low=WRITE_BUFFER_LOW)
+        self._batcher = asyncio.create_task(self._batch_writer())
         
         # Initialize connection
         await self._initialize_connection()
+        self._load_handshake()
         
     async def _initialize_connection(self):
         """Send initialize request to establish MCP session"""
         self.request_id += 1
         
-        request = {
-            "jsonrpc": "2.0",
-            "method": "initialize",
-            "params": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {},
-                "clientInfo": {
-                    "name": "ultrathink-mcp-client-v2",
-                    "version": "2.0.0"
-                }
-            },
-            "id": self.request_id
-        }
-        
         # Send and wait for response
-        response = await self._send_and_receive(request)
+        response = await self._send_frame(self.request_id, _INIT_TEMPLATE % self.request_id)
         
         if "error" in response:
             raise Exception(f"Failed to initialize MCP connection: {response['error']}")
             
         self._initialized = True
+        self._init_result = response.get("result", {})
         logger.info(f"MCP connection initialized")
         return response
         
+    def _goose_mtime(self) -> Optional[int]:
+        """mtime of the goose binary, which identifies the server version"""
+        path = shutil.which('goose')
+        try:
+            return os.stat(path).st_mtime_ns if path else None
+        except OSError:
+            return None
+            
+    def _load_handshake(self):
+        """Reuse the tool list cached by an earlier session if goose hasn't changed"""
+        mtime = self._goose_mtime()
+        if mtime is None:
+            return
+        try:
+            with open(os.path.join(self._memory_dir, HANDSHAKE_CACHE), 'rb') as f:
+                cached = _loads(f.read())
+        except (OSError, ValueError):
+            return
+        if (cached.get("goose_mtime") == mtime
+                and cached.get("protocolVersion") == self._init_result.get("protocolVersion")):
+            self._cached_tools = cached.get("tools")
+            
+    def _save_handshake(self, tools: List[Dict[str, Any]]):
+        """Persist handshake metadata for the next session"""
+        cached = {
+            "goose_mtime": self._goose_mtime(),
+            "protocolVersion": self._init_result.get("protocolVersion"),
+            "serverInfo": self._init_result.get("serverInfo"),
+            "tools": tools
+        }
+        path = os.path.join(self._memory_dir, HANDSHAKE_CACHE)
+        try:
+            os.makedirs(self._memory_dir, exist_ok=True)
+            with open(path + ".tmp", 'wb') as f:
+                f.write(_dumps(cached))
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.debug(f"Could not write handshake cache: {e}")
+        
     async def _send_and_receive(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Send request and receive response, handling ID 0 errors"""
-        # Track this request
-        request_id = request.get("id")
-        method = request.get("method")
-        self._pending_requests[request_id] = method
-        
-        # Send request
-        request_str = json.dumps(request) + '\n'
-        logger.debug(f"Sending: {request}")
-        self._writer.write(request_str.encode())
-        await self._writer.drain()
-        
-        # Read response
-        response_line = await self._reader.readline()
-        if not response_line:
+        return await self._send_frame(request.get("id"), _dumps(request))
+        
+    async def _send_frame(self, request_id: int, frame: bytes) -> Dict[str, Any]:
+        """Send a serialized request and wait for the response to request_id"""
+        # Nothing would write the request or read its reply
+        if self._closed or self._batcher is None or self._batcher.done():
             raise Exception("No response from MCP server")
             
-        response = json.loads(response_line.decode())
-        logger.debug(f"Received: {response}")
+        # Track this request
+        future = asyncio.get_running_loop().create_future()
+        self._pending_requests[request_id] = future
         
-        # Handle ID 0 error responses
-        if response.get("id") == 0 and "error" in response:
-            # This is likely an error for our most recent request
+        try:
+            self._send_queue.put_nowait((request_id, frame))
+            # The protocol resolves the future when the response frame arrives,
+            # so other requests can be sent while this one is outstanding
+            return await asyncio.wait_for(future, REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No response from MCP server within {REQUEST_TIMEOUT}s")
+        finally:
             if request_id in self._pending_requests:
-                logger.warning(f"Received ID 0 error, assuming it's for request {request_id}")
-                response["id"] = request_id
-                del self._pending_requests[request_id]
+                # Given up on before its reply arrived: keep its place so the
+                # late reply, even an ID 0 error, is matched to it and dropped
+                self._pending_requests[request_id] = None
+            
+    async def notify(self, method: str, params: Optional[Dict[str, Any]] = None):
+        """Send a JSON-RPC notification without waiting for it to be written
         
-        return response
+        Only methods in NOTIFY_METHODS are allowed, since the error goose
+        sends for any other one can't be told apart from a request's.
+        """
+        if method not in NOTIFY_METHODS:
+            raise Exception(f"Not a notification the MCP server accepts: {method}")
+            
+        notification = {"jsonrpc": "2.0", "method": method}
+        if params:
+            notification["params"] = params
+        # Queued behind earlier requests; the batcher applies backpressure
+        self._send_queue.put_nowait((None, _dumps(notification)))
+        
+    async def _batch_writer(self):
+        """Write queued requests, coalescing those queued in the same loop tick"""
+        while True:
+            batch = [await self._send_queue.get()]
+            # Let other tasks that are ready this tick queue their requests too
+            await asyncio.sleep(0)
+            while not self._send_queue.empty():
+                batch.append(self._send_queue.get_nowait())
+                
+            # disconnect() queues None to stop the writer once the rest is written
+            stopping = None in batch
+            if stopping:
+                batch = [item for item in batch if item is not None]
+                if not batch:
+                    return
+                    
+            frames = [frame for _, frame in batch]
+            if self.batch_requests and len(frames) > 1:
+                data = b'[' + b','.join(frames) + b']\n'
+            else:
+                data = b'\n'.join(frames) + b'\n'
+            # Skip formatting the payload unless debug logging is on
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Sending: %s", data)
+            
+            try:
+                self._writer.write(data)
+                # Small bursts sit in the transport buffer; only wait for the
+                # server to catch up once a real backlog builds
+                if self._writer.transport.get_write_buffer_size() > WRITE_BUFFER_LOW:
+                    await self._writer.drain()
+            except Exception as e:
+                for request_id, _ in batch:
+                    # Never sent, so no reply will come to match it with
+                    future = self._pending_requests.pop(request_id, None)
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                        
+            if stopping:
+                return
+                
+    def _dispatch(self, frame: memoryview):
+        """Resolve the pending requests a response frame answers"""
+        try:
+            data = _loads(frame)
+        except json.JSONDecodeError:
+            logger.warning(f"Failed to parse JSON: {bytes(frame)!r}")
+            return
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received: %s", data)
+        
+        # A batch request is answered with an array of responses
+        for response in (data if isinstance(data, list) else [data]):
+            # Stray output such as a bare number or string, or a non-object
+            # batch item, answers nothing
+            if not isinstance(response, dict):
+                logger.debug(f"Skipping server message: {response!r}")
+                continue
+            self._resolve(response)
+            
+    def _resolve(self, response: Dict[str, Any]):
+        """Resolve the pending request a single response answers"""
+        request_id = response.get("id")
+        
+        # Handle ID 0 error responses
+        if request_id == 0 and "error" in response and self._pending_requests:
+            # Goose answers in order, so this is most likely for the oldest outstanding request
+            request_id, future = self._pending_requests.popitem(last=False)
+            logger.warning(f"Received ID 0 error, assuming it's for request {request_id}")
+            response["id"] = request_id
+        else:
+            future = self._pending_requests.pop(request_id, None)
+        if future is None:
+            logger.debug(f"Dropping reply to request {request_id}, nobody is waiting for it")
+        elif not future.done():
+            future.set_result(response)
+            
+    def _fail_pending(self, exc: Exception):
+        """Fail every pending request once the server's stdout closes"""
+        self._closed = True
+        self._initialized = False
+        for future in self._pending_requests.values():
+            if future is not None and not future.done():
+                future.set_exception(exc)
+        self._pending_requests.clear()
         
     async def disconnect(self):
         """Close MCP connection"""
-        if self.process:
-            self.process.terminate()
-            await self.process.wait()
+        try:
+            if self._batcher:
+                # Let the batcher write what is already queued, but don't wait
+                # long on a server that has stopped reading
+                self._send_queue.put_nowait(None)
+                try:
+                    await asyncio.wait_for(self._batcher, SHUTDOWN_TIMEOUT)
+                except asyncio.TimeoutError:
+                    # wait_for has cancelled the batcher
+                    pass
+        finally:
+            # wait_for cancels the batcher along with a cancelled caller too
+            self._batcher = None
+            # Reap the server even if the caller is cancelled mid-teardown
+            await asyncio.shield(self._shutdown())
+        
+    async def _shutdown(self):
+        """Stop the server process and fail anything still waiting on it"""
+        if self.process and self.process.returncode is None:
+            # Closing stdin lets the server flush and exit by itself; signal
+            # it only if it doesn't
+            if self._writer and not self._writer.is_closing():
+                self._writer.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), SHUTDOWN_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.process.terminate()
+                try:
+                    await asyncio.wait_for(self.process.wait(), SHUTDOWN_TIMEOUT)
+                except asyncio.TimeoutError:
+                    self.process.kill()
+                    await self.process.wait()
             logger.info("MCP connection closed")
+        if self._transport:
+            self._transport.close()
+        # Requests still queued when the batcher stopped will never be answered
+        self._fail_pending(Exception("MCP connection closed"))
             
     async def list_tools(self) -> List[Dict[str, Any]]:
         """List available UltraThink tools"""
         if not self._initialized:
             raise Exception("MCP connection not initialized")
+        if self._cached_tools is not None:
+            return self._cached_tools
             
         self.request_id += 1
         
-        request = {
-            "jsonrpc": "2.0",
-            "method": "tools/list",
-            "id": self.request_id
-        }
-        
-        response = await self._send_and_receive(request)
+        response = await self._send_frame(self.request_id, _LIST_TOOLS_TEMPLATE % self.request_id)
         
-        if "error" in response:
-            # For tools/list errors, return empty list
-            logger.error(f"Tools list error: {response['error']}")
+        # Index directly; only a response without tools takes the slow path
+        try:
+            tools = response["result"]["tools"]
+        except KeyError:
+            if "error" in response:
+                # For tools/list errors, return empty list
+                logger.error(f"Tools list error: {response['error']}")
             return []
             
-        return response.get("result", {}).get("tools", [])
+        self._cached_tools = tools
+        self._save_handshake(tools)
+        return tools
         
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
         """Call a specific UltraThink tool"""
@@ -145,43 +441,65 @@ class UltraThinkMCPClientV2:
             
         self.request_id += 1
         
-        request = {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "params": {
-                "name": tool_name,
-                "arguments": arguments
-            },
-            "id": self.request_id
-        }
-        
-        response = await self._send_and_receive(request)
+        template = _TOOL_CALL_TEMPLATES.get(tool_name)
+        if template is not None:
+            # Known tool: only the arguments need encoding
+            frame = template % (_dumps(arguments), self.request_id)
+            response = await self._send_frame(self.request_id, frame)
+        else:
+            request = {
+                "jsonrpc": "2.0",
+                "method": "tools/call",
+                "params": {
+                    "name": tool_name,
+                    "arguments": arguments
+                },
+                "id": self.request_id
+            }
+            response = await self._send_and_receive(request)
         
-        if "error" in response:
-            raise Exception(f"Tool call failed: {response['error']}")
-            
-        return response.get("result", {})
+        try:
+            return response["result"]
+        except KeyError:
+            if "error" in response:
+                raise Exception(f"Tool call failed: {response['error']}")
+            return {}
     
     # High-level convenience methods
     
     async def remember(self, content: str, priority: str = "medium", 
-                      tags: Optional[List[str]] = None) -> Dict[str, Any]:
+                      tags: Optional[Sequence[str]] = None) -> Dict[str, Any]:
         """Store a memory in UltraThink"""
+        # A new memory can change any cached retrieve result
+        self._retrieve_cache.clear()
         return await self.call_tool("ultrathink_remember", {
             "content": content,
             "project": self.project,
             "priority": priority,
-            "tags": tags or []
+            "tags": tags if tags else _EMPTY_TAGS
         })
         
     async def retrieve(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Retrieve memories matching query"""
+        """Retrieve memories matching query, reusing recent identical retrievals"""
+        key = (self.project, query, limit)
+        now = time.monotonic()
+        cached = self._retrieve_cache.get(key)
+        if cached is not None and now - cached[0] < RETRIEVE_CACHE_TTL:
+            self._retrieve_cache.move_to_end(key)
+            return cached[1]
+            
         result = await self.call_tool("ultrathink_retrieve", {
             "query": query,
             "project": self.project,
             "limit": limit
         })
-        return result.get("memories", [])
+        memories = result.get("memories", [])
+        
+        self._retrieve_cache[key] = (now, memories)
+        self._retrieve_cache.move_to_end(key)
+        while len(self._retrieve_cache) > RETRIEVE_CACHE_SIZE:
+            self._retrieve_cache.popitem(last=False)
+        return memories
 
 
 # Alternative: Use goose chat directly
@@ -190,45 +508,73 @@ class GooseChatWrapper:
     
     def __init__(self, project: str = "general"):
         self.project = project
+        self._env = {**os.environ, "GOOSE_PROJECT": project}
+        # Processes still answering a message, killed by close()
+        self._processes = set()
         
     async def chat(self, message: str) -> str:
         """Send message to goose chat and get response"""
-        import os
-        env = os.environ.copy()
-        env["GOOSE_PROJECT"] = self.project
-        
-        # Run goose chat with message
+        # Run goose chat with message; goose prints no prompt when stdin is a
+        # pipe, so nothing marks the end of a reply in a long-lived session and
+        # each message gets its own process, ended by "exit"
         cmd = ['goose', 'chat', '--project', self.project]
         
         process = await asyncio.create_subprocess_exec(
             *cmd,
             stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env=env
+            stderr=asyncio.subprocess.DEVNULL,
+            env=self._env
         )
+        self._processes.add(process)
+        try:
+            return await asyncio.wait_for(self._exchange(process, message), CHAT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"goose chat did not answer within {CHAT_TIMEOUT}s")
+        finally:
+            self._processes.discard(process)
+            # Don't leave goose running if the wait timed out or was cancelled
+            if process.returncode is None:
+                process.kill()
+                await asyncio.shield(process.wait())
+                
+    async def _exchange(self, process, message: str) -> str:
+        """Send one message to a goose chat process and read back its reply"""
+        # Send message
+        process.stdin.write(f"{message}\nexit\n".encode())
+        await process.stdin.drain()
+        process.stdin.close()
         
-        # Send message and get response
-        stdout, stderr = await process.communicate(
-            input=f"{message}\nexit\n".encode()
-        )
-        
-        # Parse response
-        response = stdout.decode()
-        
-        # Extract the actual response (skip prompts and commands)
-        lines = response.split('\n')
+        # Extract the actual response (skip prompts and commands) in one pass
+        # over the output as it streams in
+        message_bytes = message.encode()
         response_lines = []
         in_response = False
         
-        for line in lines:
-            if line.strip() == message:
+        async for line in process.stdout:
+            stripped = line.strip()
+            if stripped == message_bytes:
                 in_response = True
                 continue
-            if in_response and line.strip() != 'exit':
+            if in_response:
+                if stripped == b'exit':
+                    break
                 response_lines.append(line)
                 
-        return '\n'.join(response_lines).strip()
+        # Discard anything printed after the response so goose can exit
+        async for _ in process.stdout:
+            pass
+        await process.wait()
+        
+        return b''.join(response_lines).decode().strip()
+        
+    async def close(self):
+        """Stop any goose chat process still answering a message"""
+        for process in list(self._processes):
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        self._processes.clear()
 
 
 # Test the v2 client
@@ -285,9 +631,15 @@ async def test_chat_wrapper():
         print(f"Response: {response}")
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        await wrapper.close()
+
+
+async def main():
+    """Run both tests concurrently; each owns its own client"""
+    await asyncio.gather(test_v2_client(), test_chat_wrapper())
 
 
 if __name__ == "__main__":
     # Run tests
-    asyncio.run(test_v2_client())
-    # asyncio.run(test_chat_wrapper())
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file